@@ -0,0 +1,47 @@
+# agents/_gemini.py
+import os
+from dotenv import load_dotenv
+import google.generativeai as genai
+from utils.llm_cache import llm_cache
+from utils.llm_json import extract_json
+
+# Load .env file for Gemini API key (once per process)
+load_dotenv()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if not GEMINI_API_KEY:
+    raise ValueError("Please set GEMINI_API_KEY in .env file")
+
+# Configure Gemini SDK once and share one model across agents. generate_content_async
+# goes through the SDK's process-wide grpc.aio client, i.e. a single HTTP/2 channel
+# that keeps one TLS session alive for all /moderate and /negotiate traffic.
+genai.configure(api_key=GEMINI_API_KEY)
+MODEL = genai.GenerativeModel("gemini-2.0-flash")
+
+
+async def cached_or(model, prompt, dispatch):
+    """
+    Return the cached parsed reply for prompt, or await dispatch((prompt, cache_key)) on a miss
+    """
+    cache_key = llm_cache.make_key(model.model_name, prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await dispatch((prompt, cache_key))
+
+
+async def generate_json(model, item, label):
+    """
+    Call Gemini for one (prompt, cache_key) item, parse the JSON reply and cache it
+    """
+    prompt, cache_key = item
+    try:
+        response = await model.generate_content_async(prompt)
+        result = extract_json(response.text)
+        if result is None:
+            raise ValueError("no JSON object in response")
+
+        llm_cache.set(cache_key, result)
+        return result
+    except Exception as e:
+        print(f"{label} failed: {e}")
+        return None
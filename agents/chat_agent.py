@@ -1,23 +1,27 @@
 #chat_agent.py
-import os
 import re
-import json
-from dotenv import load_dotenv
-import google.generativeai as genai
+import asyncio
+from agents._gemini import MODEL, cached_or, generate_json
+from utils.micro_batcher import MicroBatcher
 
-# Load .env file for Gemini API key
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Phone number regex (Indian format + general numbers with 10+ digits)
+_PHONE_RE = re.compile(r"\b(?:\+91|0)?\s?\d{10}\b")
+
+# Very simple spam word check, compiled into one case-insensitive alternation
+SPAM_KEYWORDS = ["buy now", "free", "offer", "limited", "click here", "visit link"]
+_SPAM_RE = re.compile("|".join(map(re.escape, SPAM_KEYWORDS)), re.IGNORECASE)
 
 
 class ChatModerationAgent:
     def __init__(self):
-        if not GEMINI_API_KEY:
-            raise ValueError("Please set GEMINI_API_KEY in .env file")
+        # Shared Gemini model, configured once in agents._gemini
+        self.model = MODEL
 
-        # Configure Gemini SDK
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        # Concurrent LLM moderation cache misses are coalesced into micro-batches (16 per 20 ms, 8 in flight)
+        # Items are (prompt, cache_key); identical in-flight prompts share one Gemini call
+        self._llm_batcher = MicroBatcher(
+            self._generate, max_batch=16, window=0.02, max_concurrency=8, key=lambda item: item[1]
+        )
 
     def rule_based_check(self, message: str):
         """
@@ -25,23 +29,16 @@ class ChatModerationAgent:
         - Detect phone numbers
         - Detect spam keywords
         """
-        # Phone number regex (Indian format + general numbers with 10+ digits)
-        phone_pattern = re.compile(r"\b(?:\+91|0)?\s?\d{10}\b")
-        if phone_pattern.search(message):
+        if _PHONE_RE.search(message):
             return {"status": "PhoneNumber", "reason": "Message contains a phone number."}
 
-        # Very simple spam word check
-        spam_keywords = ["buy now", "free", "offer", "limited", "click here", "visit link"]
-        if any(word in message.lower() for word in spam_keywords):
+        if _SPAM_RE.search(message):
             return {"status": "Spam", "reason": "Message contains spam keywords."}
 
         return None  # if nothing matched
 
-    def llm_moderation(self, message: str):
-        """
-        Use Gemini LLM to classify chat message
-        """
-        prompt = f"""
+    def _moderation_prompt(self, message: str):
+        return f"""
         You are a chat moderation agent for a marketplace.
         Classify the following message into one of:
         - Safe
@@ -57,22 +54,20 @@ class ChatModerationAgent:
         }}
         """
 
-        try:
-            response = self.model.generate_content(prompt)
-            completion_text = response.text.strip()
+    async def llm_moderation(self, message: str):
+        """
+        Use Gemini LLM to classify chat message
+        """
+        return await cached_or(self.model, self._moderation_prompt(message), self._generate)
 
-            # Handle markdown formatting from LLM
-            if completion_text.startswith("```"):
-                completion_text = completion_text.strip("`")
-                if "json" in completion_text:
-                    completion_text = completion_text.replace("json", "", 1).strip()
+    async def _batched_llm_moderation(self, message: str):
+        # Cache hits return immediately; only misses wait on the micro-batcher
+        return await cached_or(self.model, self._moderation_prompt(message), self._llm_batcher.submit)
 
-            return json.loads(completion_text)
-        except Exception as e:
-            print(f"LLM moderation failed: {e}")
-            return None
+    async def _generate(self, item):
+        return await generate_json(self.model, item, "LLM moderation")
 
-    def moderate(self, message: str):
+    async def moderate(self, message: str):
         """
         Combine rule-based + LLM moderation
         """
@@ -82,7 +77,7 @@ class ChatModerationAgent:
             return rb_result
 
         # 2. LLM classification
-        llm_result = self.llm_moderation(message)
+        llm_result = await self._batched_llm_moderation(message)
         if llm_result:
             llm_result["reason"] = f"LLM + rule-based fallback: {llm_result['reason']}"
             return llm_result
@@ -90,6 +85,12 @@ class ChatModerationAgent:
         # 3. Default safe if all else fails
         return {"status": "Safe", "reason": "Defaulted to Safe (no issues found)"}
 
+    async def moderate_batch(self, messages: list[str]):
+        """
+        Moderate many messages concurrently (LLM calls go through the micro-batcher)
+        """
+        return await asyncio.gather(*[self.moderate(m) for m in messages])
+
 
 # Example usage
 if __name__ == "__main__":
@@ -100,5 +101,6 @@ if __name__ == "__main__":
         "Buy now, limited offer, click here!",
         "You are an idiot, waste of time!"
     ]
-    for msg in messages:
-        print(msg, "=>", agent.moderate(msg))
+    results = asyncio.run(agent.moderate_batch(messages))
+    for msg, result in zip(messages, results):
+        print(msg, "=>", result)
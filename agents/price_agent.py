@@ -1,21 +1,66 @@
-import os
-import json
-from dotenv import load_dotenv
-import google.generativeai as genai
+import asyncio
+import functools
+from collections import defaultdict
+import numpy as np
+from agents._gemini import MODEL, cached_or, generate_json
+from utils.micro_batcher import MicroBatcher
 
-# Load .env file for Gemini API key
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Condition factor (anything else falls back to 0.7)
+_COND_FACTOR = {"like new": 0.9, "good": 0.75, "fair": 0.6}
+_DEFAULT_COND_FACTOR = 0.7
 
 
+@functools.lru_cache(maxsize=512)
+def _depreciation(age_months):
+    # Depreciation based on age (0.5% per month), min 50% value
+    return max(1 - (age_months * 0.005), 0.5)
+
+
+def _rule_based_reason(product, condition, age_months):
+    return (
+        f"Rule-based: category {product.get('category')}, "
+        f"condition {condition}, age {age_months} months."
+    )
+
+
+# Fraud flags, keyed off the suggested range
+_FRAUD_HIGH = "Suspicious: Asking price way too high."
+_FRAUD_LOW = "Suspicious: Asking price way too low."
+_FRAUD_NORMAL = "Normal"
+
+
+# Price prompt template, filled with str.format_map(product)
+_PRICE_PROMPT = """
+        You are a second-hand marketplace expert.
+        Suggest a fair price range (min_price, max_price) for the following product.
+
+        Product details:
+        Title: {title}
+        Category: {category}
+        Brand: {brand}
+        Condition: {condition}
+        Age in months: {age_months}
+        Asking price: {asking_price}
+        Location: {location}
+
+        Respond ONLY with JSON in this exact format:
+        {{
+          "min_price": number,
+          "max_price": number,
+          "reason": "short explanation here"
+        }}
+        """
+
 class PriceSuggestorAgent:
     def __init__(self):
-        if not GEMINI_API_KEY:
-            raise ValueError("Please set GEMINI_API_KEY in .env file")
+        # Shared Gemini model, configured once in agents._gemini
+        self.model = MODEL
 
-        # Configure Gemini SDK
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        # Concurrent LLM price cache misses are coalesced into micro-batches (16 per 20 ms, 8 in flight)
+        # Items are (prompt, cache_key); identical in-flight prompts share one Gemini call
+        self._llm_batcher = MicroBatcher(
+            self._generate, max_batch=16, window=0.02, max_concurrency=8, key=lambda item: item[1]
+        )
 
     def rule_based_price(self, product):
         """
@@ -25,93 +70,133 @@ class PriceSuggestorAgent:
         condition = product.get("condition", "Good").lower()
         age_months = product.get("age_months", 12)
 
-        # Condition factor
-        if condition == "like new":
-            factor = 0.9
-        elif condition == "good":
-            factor = 0.75
-        elif condition == "fair":
-            factor = 0.6
-        else:
-            factor = 0.7  # default
-
-        # Depreciation based on age (0.5% per month)
-        depreciation = 1 - (age_months * 0.005)
-        depreciation = max(depreciation, 0.5)  # min 50% value
+        factor = _COND_FACTOR.get(condition, _DEFAULT_COND_FACTOR)
+        depreciation = _depreciation(age_months)
 
         base_price = asking_price * factor * depreciation
         min_price = round(base_price * 0.95)
         max_price = round(base_price * 1.05)
 
-        reason = (
-            f"Rule-based: category {product.get('category')}, "
-            f"condition {condition}, age {age_months} months."
-        )
+        reason = _rule_based_reason(product, condition, age_months)
         return {"min_price": min_price, "max_price": max_price, "reason": reason}
 
-    def llm_price(self, product):
+    def _rule_based_arrays(self, products):
+        # Same math as rule_based_price, as NumPy expressions over the whole batch
+        asking = np.array([p.get("asking_price", 1000) for p in products], dtype=np.float64)
+        ages = np.array([p.get("age_months", 12) for p in products], dtype=np.float64)
+        conditions = np.array([p.get("condition", "Good").lower() for p in products], dtype=str)
+
+        factors = np.select(
+            [conditions == c for c in _COND_FACTOR], list(_COND_FACTOR.values()), _DEFAULT_COND_FACTOR
+        )
+        depreciation = np.maximum(1 - ages * 0.005, 0.5)
+
+        base = asking * factors * depreciation
+        min_prices = np.round(base * 0.95).astype(np.int64)
+        max_prices = np.round(base * 1.05).astype(np.int64)
+        return conditions, min_prices, max_prices
+
+    def _rule_based_results(self, products, conditions, min_prices, max_prices):
+        return [
+            {
+                "min_price": min_price,
+                "max_price": max_price,
+                "reason": _rule_based_reason(product, condition, product.get("age_months", 12)),
+            }
+            for product, condition, min_price, max_price in zip(
+                products, conditions.tolist(), min_prices.tolist(), max_prices.tolist()
+            )
+        ]
+
+    def _price_prompt(self, product):
+        # Missing fields render as empty strings
+        return _PRICE_PROMPT.format_map(defaultdict(str, product))
+
+    async def llm_price(self, product):
         """
         Call Gemini API to suggest price using LLM
         """
-        prompt = f"""
-        You are a second-hand marketplace expert.
-        Suggest a fair price range (min_price, max_price) for the following product.
-
-        Product details:
-        Title: {product.get('title')}
-        Category: {product.get('category')}
-        Brand: {product.get('brand')}
-        Condition: {product.get('condition')}
-        Age in months: {product.get('age_months')}
-        Asking price: {product.get('asking_price')}
-        Location: {product.get('location')}
-
-        Respond ONLY with JSON in this exact format:
-        {{
-          "min_price": number,
-          "max_price": number,
-          "reason": "short explanation here"
-        }}
-        """
+        return await cached_or(self.model, self._price_prompt(product), self._generate)
 
-        try:
-            response = self.model.generate_content(prompt)
-            completion_text = response.text.strip()
+    async def _batched_llm_price(self, product):
+        # Cache hits return immediately; only misses wait on the micro-batcher
+        return await cached_or(self.model, self._price_prompt(product), self._llm_batcher.submit)
 
-            # Try to find JSON inside response text
-            if completion_text.startswith("```"):
-                completion_text = completion_text.strip("`")  # remove markdown formatting
-                if "json" in completion_text:
-                    completion_text = completion_text.replace("json", "", 1).strip()
+    async def _generate(self, item):
+        return await generate_json(self.model, item, "LLM price suggestion")
 
-            return json.loads(completion_text)
-        except Exception as e:
-            print(f"LLM price suggestion failed: {e}")
-            return None
+    def needs_llm(self, product, rb_result):
+        """
+        True when the product lacks metadata or its asking price falls in the
+        fraud band of the rule-based estimate
+        """
+        asking_price = product.get("asking_price", 0)
+        return (
+            not product.get("brand")
+            or not product.get("location")
+            or asking_price > rb_result["max_price"] * 1.5
+            or asking_price < rb_result["min_price"] * 0.5
+        )
 
-    def suggest_price(self, product):
+    async def suggest_price(self, product):
         """
         Combine rule-based and LLM suggestion
         + Fraud detection for unrealistic prices
         """
-        # 1. Try LLM
-        result = self.llm_price(product)
+        # 1. Cheap rule-based estimate first
+        rb_result = self.rule_based_price(product)
+
+        # 2. Only ask the LLM when the rule-based estimate can't be trusted
+        result = None
+        if self.needs_llm(product, rb_result):
+            result = await self._batched_llm_price(product)
         if result:
             result["reason"] = f"LLM + rule-based fallback: {result['reason']}"
         else:
-            # 2. Fallback to rule-based
-            result = self.rule_based_price(product)
+            result = rb_result
 
         # 3. Fraud detection logic
+        result["fraud_flag"] = self.fraud_flag(product, result)
+
+        return result
+
+    @staticmethod
+    def fraud_flag(product, result):
         asking_price = product.get("asking_price", 0)
         if asking_price > result["max_price"] * 1.5:
-            result["fraud_flag"] = "Suspicious: Asking price way too high."
-        elif asking_price < result["min_price"] * 0.5:
-            result["fraud_flag"] = "Suspicious: Asking price way too low."
-        else:
-            result["fraud_flag"] = "Normal"
+            return _FRAUD_HIGH
+        if asking_price < result["min_price"] * 0.5:
+            return _FRAUD_LOW
+        return _FRAUD_NORMAL
 
-        return result
+    async def suggest_price_batch(self, products: list[dict]):
+        """
+        Suggest prices for many products: one vectorized rule-based pass,
+        then Gemini (via the micro-batcher) only for products that need it
+        """
+        # 1. Rule-based estimates + fraud band for the whole batch
+        conditions, min_prices, max_prices = self._rule_based_arrays(products)
+        results = self._rule_based_results(products, conditions, min_prices, max_prices)
+        asking = np.array([p.get("asking_price", 0) for p in products], dtype=np.float64)
+        too_high = asking > max_prices * 1.5
+        too_low = asking < min_prices * 0.5
+        missing_meta = np.array(
+            [not p.get("brand") or not p.get("location") for p in products], dtype=bool
+        )
+        flags = np.where(too_high, _FRAUD_HIGH, np.where(too_low, _FRAUD_LOW, _FRAUD_NORMAL))
+        for result, flag in zip(results, flags.tolist()):
+            result["fraud_flag"] = flag
+
+        # 2. LLM only for the subset the rules can't be trusted on (see needs_llm)
+        llm_idx = np.flatnonzero(missing_meta | too_high | too_low).tolist()
+        llm_results = await asyncio.gather(*[self._batched_llm_price(products[i]) for i in llm_idx])
+        for i, llm_result in zip(llm_idx, llm_results):
+            if llm_result:
+                llm_result["reason"] = f"LLM + rule-based fallback: {llm_result['reason']}"
+                llm_result["fraud_flag"] = self.fraud_flag(products[i], llm_result)
+                results[i] = llm_result
+
+        return results
 
 
 # Example usage
@@ -126,5 +211,5 @@ if __name__ == "__main__":
         "asking_price": 35000,
         "location": "Mumbai",
     }
-    price_suggestion = agent.suggest_price(sample_product)
+    price_suggestion = asyncio.run(agent.suggest_price(sample_product))
     print(price_suggestion)
@@ -1,47 +1,49 @@
-import pandas as pd
+import json
+import functools
+import numpy as np
+from utils.catalog import ProductCatalog
 
 
 class RecommendationAgent:
-    def __init__(self, dataset_path="dataset.csv"):
-        self.dataset_path = dataset_path
-        self.dataset = pd.read_csv(dataset_path)
+    def __init__(self, dataset_path="dataset.csv", catalog=None, use_embeddings=False):
+        # Share an already loaded catalog when given, otherwise load our own
+        self.catalog = catalog if catalog is not None else ProductCatalog(dataset_path)
+        self.dataset_path = self.catalog.dataset_path
+
+        # Optional ANN search over text embeddings (needs sentence-transformers + faiss-cpu)
+        self.embedding_index = None
+        if use_embeddings:
+            from utils.embedding_index import EmbeddingIndex
+
+            self.embedding_index = EmbeddingIndex(self.catalog)
+
+        # Dataset is immutable at runtime, so memoize results per (product_id, top_n)
+        self._recommend_json = functools.lru_cache(maxsize=4096)(self._recommend_json)
 
     def recommend(self, product_id, top_n=3):
         """
         Recommend similar products from dataset
         """
+        # Cached as a JSON string so every caller gets a fresh, unshared dict
+        return json.loads(self._recommend_json(int(product_id), int(top_n)))
+
+    def _recommend_json(self, product_id, top_n):
+        return json.dumps(self._recommend(product_id, top_n))
+
+    def _recommend(self, product_id, top_n):
+        catalog = self.catalog
+
         # Find target product
-        product = self.dataset[self.dataset["id"] == product_id]
-        if product.empty:
+        idx = catalog.id_to_idx.get(product_id)
+        if idx is None:
             return {"error": f"Product with id {product_id} not found."}
 
-        product = product.iloc[0]
+        product = catalog.row(idx)
 
-        # Filter by category
-        same_category = self.dataset[
-            (self.dataset["category"] == product["category"])
-            & (self.dataset["id"] != product_id)
-        ].copy()
-
-        # Add similarity score
-        def score(row):
-            score = 0
-            if row["brand"] == product["brand"]:
-                score += 2
-            if abs(row["age_months"] - product["age_months"]) <= 12:
-                score += 1
-            if abs(row["asking_price"] - product["asking_price"]) <= 5000:
-                score += 1
-            return score
-
-        same_category["similarity"] = same_category.apply(score, axis=1)
-
-        # Sort by similarity & pick top_n
-        recommendations = (
-            same_category.sort_values(by="similarity", ascending=False)
-            .head(top_n)
-            .to_dict(orient="records")
-        )
+        if self.embedding_index is not None:
+            recommendations = self._recommend_by_embedding(idx, product, top_n)
+        else:
+            recommendations = self._recommend_by_rules(idx, product, top_n)
 
         return {
             "product_id": int(product_id),
@@ -49,11 +51,60 @@ class RecommendationAgent:
             "recommendations": recommendations,
         }
 
+    def _recommend_by_rules(self, idx, product, top_n):
+        catalog = self.catalog
+        cols = catalog.cols
+        product_id = product["id"]
+
+        # Filter by category
+        candidates = catalog.category_idx.get(product["category"], np.empty(0, dtype=np.intp))
+        candidates = candidates[cols["id"][candidates] != product_id]
+
+        # Add similarity score (vectorized: brand match = 2, close age = 1, close price = 1)
+        brand_code = catalog.brand_codes[idx]
+        brand = (catalog.brand_codes[candidates] == brand_code) & (brand_code != -1)
+        age = np.abs(cols["age_months"][candidates] - product["age_months"]) <= 12
+        price = np.abs(cols["asking_price"][candidates] - product["asking_price"]) <= 5000
+        similarity = 2 * brand.astype(np.int64) + age + price
+
+        # Pick top_n by similarity: O(N) partition, then order only the selected rows
+        top_n = max(min(top_n, len(similarity)), 0)
+        if top_n < len(similarity):
+            top = np.argpartition(-similarity, top_n)[:top_n]
+        else:
+            top = np.arange(len(similarity))
+        top = top[np.argsort(-similarity[top], kind="stable")]
+
+        return [
+            {**catalog.row(candidates[i]), "similarity": int(similarity[i])} for i in top
+        ]
+
+    def _recommend_by_embedding(self, idx, product, top_n):
+        catalog = self.catalog
+        if top_n <= 0:
+            return []
+
+        # Over-fetch neighbours, then keep same-category rows other than the product itself;
+        # widen to the whole index once if the category is sparse among them
+        k = min(len(catalog), (top_n + 1) * 4)
+        while True:
+            neighbours, scores = self.embedding_index.search(idx, k)
+            recommendations = []
+            for i, score in zip(neighbours.tolist(), scores.tolist()):
+                row = catalog.row(i)
+                if row["id"] == product["id"] or row["category"] != product["category"]:
+                    continue
+                recommendations.append({**row, "similarity": round(score, 4)})
+                if len(recommendations) == top_n:
+                    return recommendations
+            if k >= len(catalog):
+                return recommendations
+            k = len(catalog)
+
 
 # Example usage
 if __name__ == "__main__":
     agent = RecommendationAgent("dataset.csv")
     result = agent.recommend(1, top_n=3)
-    import json
 
     print(json.dumps(result, indent=2))
@@ -0,0 +1,16 @@
+import os
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.ipc
+
+# Convert the product CSV into an Arrow IPC file that ProductCatalog can memory-map
+csv_path = os.path.join("data", "products.csv")
+arrow_path = os.path.join("data", "products.arrow")
+
+# Empty cells become nulls, matching how pd.read_csv reads them as NaN
+convert_options = pa.csv.ConvertOptions(strings_can_be_null=True)
+table = pa.csv.read_csv(csv_path, convert_options=convert_options)
+with pa.OSFile(arrow_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+    writer.write_table(table)
+
+print(f"Arrow file created successfully as '{arrow_path}' ({table.num_rows} rows)")
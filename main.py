@@ -1,6 +1,5 @@
 # main.py
 import os
-import pandas as pd
 from fastapi import FastAPI
 from pydantic import BaseModel
 
@@ -9,15 +8,22 @@ from agents.price_agent import PriceSuggestorAgent
 from agents.chat_agent import ChatModerationAgent
 from agents.recommendation_agent import RecommendationAgent
 from utils.logger import Logger
+from utils.llm_cache import llm_cache
+from utils.catalog import ProductCatalog
 
-# Load Dataset
+# Load Dataset (once, shared by the routes and the recommendation agent)
 data_path = os.path.join("data", "products.csv")
-df = pd.read_csv(data_path)
+catalog = ProductCatalog(data_path)
+products_by_id = catalog.products_by_id
+_sample = next(iter(products_by_id.values()), None)
 
 # Initialize Agents
 price_agent = PriceSuggestorAgent()
 chat_agent = ChatModerationAgent()
-recommendation_agent = RecommendationAgent(dataset_path=data_path)
+recommendation_agent = RecommendationAgent(
+    catalog=catalog,
+    use_embeddings=os.getenv("RECOMMENDER_EMBEDDINGS") == "1",
+)
 
 # Initialize Logger (singleton)
 logger = Logger()
@@ -40,36 +46,47 @@ class ChatRequest(BaseModel):
 
 # Routes
 @app.post("/negotiate")
-def negotiate_price(product: ProductRequest):
+async def negotiate_price(product: ProductRequest):
     """
     Suggest price for a product using PriceSuggestorAgent
     and log the negotiation.
     """
-    result = price_agent.suggest_price(product.dict())
+    result = await price_agent.suggest_price(product.dict())
     # Log the negotiation
     logger.log_negotiation(product_input=product.dict(), product_id=None, result=result)
     return result
 
 @app.get("/negotiate/{product_id}")
-def negotiate_by_id(product_id: int):
+async def negotiate_by_id(product_id: int):
     """
     Suggest price for a product directly from dataset by product_id
     """
-    product = df[df["id"] == product_id]
-    if product.empty:
+    product_dict = products_by_id.get(product_id)
+    if product_dict is None:
         return {"error": f"Product with id {product_id} not found."}
-    product_dict = product.iloc[0].to_dict()
-    result = price_agent.suggest_price(product_dict)
+    result = await price_agent.suggest_price(product_dict)
     # Log the negotiation
     logger.log_negotiation(product_input=product_dict, product_id=product_id, result=result)
     return {"product": product_dict, "suggestion": result}
 
+@app.post("/negotiate/batch")
+async def negotiate_batch(products: list[ProductRequest]):
+    """
+    Suggest prices for many products in one call (vectorized rule-based pass,
+    LLM only where needed) and log each negotiation.
+    """
+    product_dicts = [product.dict() for product in products]
+    results = await price_agent.suggest_price_batch(product_dicts)
+    for product_dict, result in zip(product_dicts, results):
+        logger.log_negotiation(product_input=product_dict, product_id=None, result=result)
+    return results
+
 @app.post("/moderate")
-def moderate_chat(chat: ChatRequest):
+async def moderate_chat(chat: ChatRequest):
     """
     Moderate a chat message and log the result
     """
-    result = chat_agent.moderate(chat.message)
+    result = await chat_agent.moderate(chat.message)
     logger.log_moderation(message=chat.message, result=result)
     return result
 
@@ -81,8 +98,15 @@ def recommend_product(product_id: int, top_n: int = 3):
     recs = recommendation_agent.recommend(product_id=product_id, top_n=top_n)
     return recs
 
+@app.get("/cache-stats")
+def cache_stats():
+    """
+    Hit/miss counters for the shared LLM response cache
+    """
+    return llm_cache.stats()
+
 # Debug Endpoint (optional)
 @app.get("/sample-product")
 def get_sample_product():
     """Return first product from dataset as JSON"""
-    return df.iloc[0].to_dict()
+    return _sample
@@ -0,0 +1,85 @@
+# utils/catalog.py
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: only needed to read the prebuilt .arrow file
+    pa = None
+
+
+class ProductCatalog:
+    """
+    Read-only product dataset, loaded once and held as columnar NumPy arrays
+    """
+
+    def __init__(self, dataset_path):
+        self.dataset_path = dataset_path
+        self.arrow_path = os.path.splitext(dataset_path)[0] + ".arrow"
+
+        if self._use_arrow():
+            self._load_arrow()
+        else:
+            self._load_csv()
+
+        # id -> row index / row dict (first occurrence wins, like a boolean mask + iloc[0])
+        self.id_to_idx = {}
+        for idx, product_id in enumerate(self.cols["id"].tolist()):
+            self.id_to_idx.setdefault(int(product_id), idx)
+        self.products_by_id = {pid: self.records[idx] for pid, idx in self.id_to_idx.items()}
+
+        # Integer brand codes so brand equality is an int compare (-1 = missing)
+        self.brand_codes, _ = pd.factorize(self.cols["brand"])
+
+        # Row indices per category so the category filter is a dict lookup
+        self.category_idx = (
+            pd.Series(np.arange(len(self.records))).groupby(self.cols["category"], sort=False).indices
+        )
+
+    def _use_arrow(self):
+        # Prefer the Arrow IPC file (see create_arrow.py) unless the CSV is newer
+        if pa is None or not os.path.exists(self.arrow_path):
+            return False
+        if not os.path.exists(self.dataset_path):
+            return True
+        return os.path.getmtime(self.arrow_path) >= os.path.getmtime(self.dataset_path)
+
+    def _load_arrow(self):
+        # Reading the IPC file skips CSV parsing; the rows below are still copied into
+        # this process (columns, records), so memory use matches the CSV path
+        with pa.memory_map(self.arrow_path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+
+        # Same frame shape as pd.read_csv: int columns with nulls become float NaN,
+        # and null strings become NaN instead of None
+        df = table.to_pandas()
+        for c in df.select_dtypes(include="object").columns:
+            df[c] = df[c].where(df[c].notna(), np.nan)
+        self._load_frame(df)
+
+    def _load_csv(self):
+        self._load_frame(pd.read_csv(self.dataset_path))
+
+    def _load_frame(self, df):
+        self.columns = list(df.columns)
+        self.cols = {c: df[c].to_numpy() for c in self.columns}
+
+        # Rows as native-Python dicts, built once and shared read-only
+        self.records = df.to_dict(orient="records")
+
+    def __len__(self):
+        return len(self.records)
+
+    def row(self, idx):
+        """
+        Return row idx as a dict of native Python values (shared, do not mutate)
+        """
+        return self.records[idx]
+
+    def get(self, product_id):
+        """
+        Return the product with this id as a dict (shared, do not mutate), or None if missing
+        """
+        return self.products_by_id.get(product_id)
@@ -0,0 +1,74 @@
+# utils/embedding_index.py
+import os
+import json
+import hashlib
+import numpy as np
+
+# Sentence-transformer used to embed "title category brand"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+class EmbeddingIndex:
+    """
+    HNSW (int8 scalar-quantized) index over normalized product embeddings.
+
+    Embeddings and the index are saved next to the dataset, with a hash of the
+    encoded texts, and reloaded on the next start while that hash still matches,
+    so encoding only happens when the rows change. Needs the
+    optional sentence-transformers and faiss-cpu packages.
+    """
+
+    def __init__(self, catalog, hnsw_m=32):
+        import faiss
+
+        base_path = os.path.splitext(catalog.dataset_path)[0]
+        self.emb_path = base_path + ".emb.npy"
+        self.index_path = base_path + ".faiss"
+        self.hash_path = base_path + ".emb.sha256"
+
+        # Saved files are only reused if they were built from exactly these texts
+        texts = [f"{r['title']} {r['category']} {r['brand']}" for r in catalog.records]
+        digest = hashlib.sha256(json.dumps([EMBEDDING_MODEL, texts]).encode("utf-8")).hexdigest()
+
+        if not self._load_saved(faiss, digest, len(texts)):
+            self.emb = self._encode(texts)
+            self.index = faiss.IndexHNSWSQ(self.emb.shape[1], faiss.ScalarQuantizer.QT_8bit, hnsw_m)
+            self.index.train(self.emb)
+            self.index.add(self.emb)
+            np.save(self.emb_path, self.emb)
+            faiss.write_index(self.index, self.index_path)
+            with open(self.hash_path, "w", encoding="utf-8") as f:
+                f.write(digest)
+
+    def _load_saved(self, faiss, digest, n_rows):
+        if not all(os.path.exists(p) for p in (self.emb_path, self.index_path, self.hash_path)):
+            return False
+        with open(self.hash_path, encoding="utf-8") as f:
+            if f.read().strip() != digest:
+                return False
+
+        # Memory-map the saved embeddings instead of re-encoding
+        emb = np.load(self.emb_path, mmap_mode="r")
+        index = faiss.read_index(self.index_path)
+        if emb.shape[0] != n_rows or index.ntotal != n_rows:
+            return False
+
+        self.emb, self.index = emb, index
+        return True
+
+    @staticmethod
+    def _encode(texts):
+        from sentence_transformers import SentenceTransformer
+
+        encoder = SentenceTransformer(EMBEDDING_MODEL)
+        emb = encoder.encode(texts, batch_size=128, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(emb, dtype=np.float32)
+
+    def search(self, idx, k):
+        """
+        Return (row indices, cosine similarities) of the k nearest rows to row idx
+        """
+        distances, indices = self.index.search(np.ascontiguousarray(self.emb[idx:idx + 1]), k)
+        found = indices[0] >= 0
+        # Squared L2 between unit vectors: d = 2 - 2 * cos
+        return indices[0][found], 1 - distances[0][found] / 2
@@ -0,0 +1,48 @@
+# utils/llm_cache.py
+import copy
+import json
+import hashlib
+from cachetools import TTLCache
+
+
+class LLMCache:
+    """
+    In-memory TTL cache for parsed LLM responses, keyed by (model, prompt)
+    """
+
+    def __init__(self, maxsize=10_000, ttl=3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name, prompt):
+        payload = json.dumps({"model": model_name, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Callers mutate the result (e.g. prefixing "reason"), so hand out a copy
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        self._cache[key] = copy.deepcopy(value)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+        }
+
+
+# Shared by all agents so /cache-stats reports process-wide numbers
+llm_cache = LLMCache()
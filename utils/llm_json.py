@@ -0,0 +1,16 @@
+# utils/llm_json.py
+import re
+import orjson
+
+# Outermost {...} span; covers plain, ```json fenced and <json>-tagged replies alike
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def extract_json(text):
+    """
+    Parse the JSON object embedded in an LLM reply, or return None if there is none
+    """
+    match = _JSON_RE.search(text)
+    if not match:
+        return None
+    return orjson.loads(match.group(0))
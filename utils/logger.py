@@ -1,16 +1,35 @@
 # utils/logger.py
 import os
 import csv
-import json
+import time
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+import orjson
+
+try:
+    import fcntl  # POSIX only; used to keep appends from sibling worker processes whole
+except ImportError:
+    fcntl = None
+
+# Background writer batching: flush after this many entries or this many seconds
+_BATCH_SIZE = 256
+_BATCH_WINDOW = 0.1
 
 class Logger:
     _instance = None  # Singleton instance
+    _lock = threading.Lock()
 
     def __new__(cls, log_dir="logs"):
+        # Double-checked locking: only one thread ever runs _init
         if cls._instance is None:
-            cls._instance = super(Logger, cls).__new__(cls)
-            cls._instance._init(log_dir)
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(Logger, cls).__new__(cls)
+                    instance._init(log_dir)
+                    cls._instance = instance
         return cls._instance
 
     def _init(self, log_dir):
@@ -20,13 +39,30 @@ class Logger:
         # Define file paths
         self.negotiation_log_csv = os.path.join(log_dir, "negotiation_log.csv")
         self.moderation_log_csv = os.path.join(log_dir, "moderation_log.csv")
-        self.negotiation_log_json = os.path.join(log_dir, "negotiation_log.json")
-        self.moderation_log_json = os.path.join(log_dir, "moderation_log.json")
+        self.negotiation_log_jsonl = os.path.join(log_dir, "negotiation_log.jsonl")
+        self.moderation_log_jsonl = os.path.join(log_dir, "moderation_log.jsonl")
 
         # Ensure CSV headers exist
         self._init_csv(self.negotiation_log_csv, ["timestamp", "product_id", "input", "output"])
         self._init_csv(self.moderation_log_csv, ["timestamp", "message", "output"])
 
+        # Keep the log files open with a ready CSV writer; only the writer thread touches them
+        self._neg_csv_fp = open(self.negotiation_log_csv, "a", newline="", encoding="utf-8")
+        self._mod_csv_fp = open(self.moderation_log_csv, "a", newline="", encoding="utf-8")
+        self._neg_writer = csv.writer(self._neg_csv_fp)
+        self._mod_writer = csv.writer(self._mod_csv_fp)
+        self._neg_jsonl_fp = open(self.negotiation_log_jsonl, "ab")
+        self._mod_jsonl_fp = open(self.moderation_log_jsonl, "ab")
+
+        # Writer-thread cache of (unix second, ISO string) for CSV timestamps
+        self._iso_cache = (None, "")
+
+        # Request handlers only enqueue; a daemon thread does the disk I/O
+        self._queue = queue.Queue(maxsize=10_000)
+        self._writer_thread = threading.Thread(target=self._drain, name="logger-writer", daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.flush)
+
     def _init_csv(self, filepath, headers):
         if not os.path.exists(filepath):
             with open(filepath, "w", newline="", encoding="utf-8") as f:
@@ -34,51 +70,113 @@ class Logger:
                 writer.writerow(headers)
 
     def log_negotiation(self, product_id, product_input, result):
-        timestamp = datetime.now().isoformat()
-        row = [timestamp, product_id, json.dumps(product_input), json.dumps(result)]
-
-        # Append to CSV
-        with open(self.negotiation_log_csv, "a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
-
-        # Append to JSON
-        self._append_json(self.negotiation_log_json, {
-            "timestamp": timestamp,
-            "product_id": product_id,
-            "input": product_input,
-            "output": result
-        })
+        timestamp = time.time_ns()
+        self._enqueue(("negotiation", timestamp, product_id, product_input, result))
 
     def log_moderation(self, message, result):
-        timestamp = datetime.now().isoformat()
-        row = [timestamp, message, json.dumps(result)]
-
-        # Append to CSV
-        with open(self.moderation_log_csv, "a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
-
-        # Append to JSON
-        self._append_json(self.moderation_log_json, {
-            "timestamp": timestamp,
-            "message": message,
-            "output": result
-        })
-
-    def _append_json(self, filepath, entry):
-        data = []
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
+        timestamp = time.time_ns()
+        self._enqueue(("moderation", timestamp, message, result))
+
+    def flush(self):
+        """
+        Block until every queued entry has been written
+        """
+        self._queue.join()
+
+    def _enqueue(self, entry):
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            print(f"Log queue full, dropping {entry[0]} entry")
+
+    def _drain(self):
+        while True:
+            # Wait for one entry, then collect more until the batch is full or the window closes
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + _BATCH_WINDOW
+            while len(batch) < _BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
 
-        data.append(entry)
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Log write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        negotiation_rows, negotiation_entries = [], []
+        moderation_rows, moderation_entries = [], []
+
+        for kind, timestamp, *fields in batch:
+            iso_timestamp = self._format_iso(timestamp)
+            if kind == "negotiation":
+                product_id, product_input, result = fields
+                negotiation_rows.append([
+                    iso_timestamp, product_id, orjson.dumps(product_input).decode(), orjson.dumps(result).decode()
+                ])
+                negotiation_entries.append({
+                    "timestamp": timestamp,
+                    "product_id": product_id,
+                    "input": product_input,
+                    "output": result
+                })
+            else:
+                message, result = fields
+                moderation_rows.append([iso_timestamp, message, orjson.dumps(result).decode()])
+                moderation_entries.append({
+                    "timestamp": timestamp,
+                    "message": message,
+                    "output": result
+                })
+
+        if negotiation_rows:
+            self._append_csv(self._neg_csv_fp, self._neg_writer, negotiation_rows)
+            self._append_jsonl(self._neg_jsonl_fp, negotiation_entries)
+        if moderation_rows:
+            self._append_csv(self._mod_csv_fp, self._mod_writer, moderation_rows)
+            self._append_jsonl(self._mod_jsonl_fp, moderation_entries)
+
+    def _format_iso(self, timestamp_ns):
+        # Only build a datetime when the second changes; append microseconds to the cached prefix
+        seconds, nanos = divmod(timestamp_ns, 1_000_000_000)
+        if seconds != self._iso_cache[0]:
+            self._iso_cache = (seconds, datetime.fromtimestamp(seconds).isoformat())
+        return f"{self._iso_cache[1]}.{nanos // 1000:06d}"
+
+    def _append_csv(self, fp, writer, rows):
+        with _file_lock(fp):
+            writer.writerows(rows)
+            fp.flush()
+
+    def _append_jsonl(self, fp, entries):
+        # One compact JSON object per line: O(1) per write regardless of log size
+        with _file_lock(fp):
+            fp.write(b"".join(orjson.dumps(e) + b"\n" for e in entries))
+            fp.flush()
+
+
+@contextmanager
+def _file_lock(fp):
+    """
+    Exclusive flock around a write so multi-worker deployments don't tear rows
+    (no-op where fcntl is unavailable)
+    """
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
 
 
 # Example usage
@@ -102,5 +200,6 @@ if __name__ == "__main__":
     message = "Call me at 9876543210"
     moderation_result = {"status": "PhoneNumber", "reason": "Message contains a phone number."}
     logger.log_moderation(message, moderation_result)
+    logger.flush()
 
     print("✅ Logs written to /logs directory")
\ No newline at end of file
@@ -0,0 +1,81 @@
+# utils/micro_batcher.py
+import copy
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent calls to an async handler into small batches.
+
+    Callers park on a future; a flush task dispatches at most `max_batch`
+    parked items per `window` seconds, running them concurrently with at most
+    `max_concurrency` handler calls in flight. Each caller is resolved as soon
+    as its own handler call finishes.
+
+    With `key` (item -> hashable), a submit whose key is already parked or in
+    flight joins that call instead of making a new one; every caller then gets
+    its own deep copy of the result.
+    """
+
+    def __init__(self, handler, max_batch=16, window=0.02, max_concurrency=8, key=None):
+        self.handler = handler
+        self.key = key
+        self.max_batch = max_batch
+        self.window = window
+        self.max_concurrency = max_concurrency
+        self._loop = None  # loop the state below belongs to
+        self._semaphore = None
+        self._pending = []
+        self._flush_task = None
+        self._item_tasks = set()  # strong refs so running calls aren't garbage collected
+        self._inflight = {}  # key -> future of the parked/running call for that key
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # asyncio primitives are bound to one loop; start fresh on a new one
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._pending = []
+            self._flush_task = None
+            self._item_tasks = set()
+            self._inflight = {}
+
+        if self.key is None:
+            return await self._park(loop, item)
+
+        item_key = self.key(item)
+        fut = self._inflight.get(item_key)
+        if fut is None:
+            fut = self._inflight[item_key] = self._park(loop, item)
+            fut.add_done_callback(lambda _: self._inflight.pop(item_key, None))
+        # Shielded so one cancelled caller doesn't cancel the call for the others
+        return copy.deepcopy(await asyncio.shield(fut))
+
+    def _park(self, loop, item):
+        fut = loop.create_future()
+        self._pending.append((item, fut))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+        return fut
+
+    async def _flush(self):
+        while self._pending:
+            await asyncio.sleep(self.window)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            for item, fut in batch:
+                task = asyncio.create_task(self._run_one(item, fut))
+                self._item_tasks.add(task)
+                task.add_done_callback(self._item_tasks.discard)
+
+    async def _run_one(self, item, fut):
+        try:
+            async with self._semaphore:
+                result = await self.handler(item)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+            return
+        if not fut.done():  # caller went away (e.g. request cancelled)
+            fut.set_result(result)